@@ -1,43 +1,72 @@
+import random
+import sys
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Optional, Tuple
 
-BLACK_PAWN = "p"
-BLACK_ROOK = "r"
-BLACK_KNIGHT = "n"
-BLACK_BISHOP = "b"
-BLACK_KING = "k"
-BLACK_QUEEN = "q"
-
-WHITE_PAWN = "P"
-WHITE_ROOK = "R"
-WHITE_KNIGHT = "N"
-WHITE_BISHOP = "B"
-WHITE_KING = "K"
-WHITE_QUEEN = "Q"
-
-EMPTY = "."
-
-BLACK_PIECES = (
+# The piece constants are bound to CPython's cached 1-character string
+# singletons (what indexing a row string also returns) via a runtime chr()
+# call, so hot paths can compare squares with 'is' — a pointer compare
+# instead of a unicode compare. A plain literal is not guaranteed to be
+# that singleton.
+BLACK_PAWN = chr(ord("p"))
+BLACK_ROOK = chr(ord("r"))
+BLACK_KNIGHT = chr(ord("n"))
+BLACK_BISHOP = chr(ord("b"))
+BLACK_KING = chr(ord("k"))
+BLACK_QUEEN = chr(ord("q"))
+
+WHITE_PAWN = chr(ord("P"))
+WHITE_ROOK = chr(ord("R"))
+WHITE_KNIGHT = chr(ord("N"))
+WHITE_BISHOP = chr(ord("B"))
+WHITE_KING = chr(ord("K"))
+WHITE_QUEEN = chr(ord("Q"))
+
+EMPTY = chr(ord("."))
+EMPTY_CODE = ord(EMPTY)
+
+# Canonical empty rank, shared by every board that has one. Boards in an
+# endgame hold several empty ranks, so handing out one interned object
+# shrinks snapshots and lets row comparisons short-circuit on identity.
+EMPTY_ROW = sys.intern(EMPTY * 8)
+EMPTY_ROW_BYTES = EMPTY_ROW.encode("ascii")
+
+BLACK_PIECES = frozenset((
     BLACK_ROOK,
     BLACK_KNIGHT,
     BLACK_BISHOP,
     BLACK_QUEEN,
     BLACK_KING,
-    BLACK_BISHOP,
-    BLACK_KNIGHT,
-    BLACK_ROOK,
     BLACK_PAWN,
-)
+))
 
-WHITE_PIECES = (
+WHITE_PIECES = frozenset((
     WHITE_ROOK,
     WHITE_KNIGHT,
     WHITE_BISHOP,
     WHITE_QUEEN,
     WHITE_KING,
-    WHITE_BISHOP,
-    WHITE_KNIGHT,
-    WHITE_ROOK,
     WHITE_PAWN,
+))
+
+# Indexed by whites_turn, so the side to move needs no branch to look up
+SIDE_PIECES = (BLACK_PIECES, WHITE_PIECES)
+
+# Piece groups used to dispatch on piece kind during move generation,
+# hoisted to module scope so the hot path does not rebuild them per call
+PAWNS = (WHITE_PAWN, BLACK_PAWN)
+KINGS = (BLACK_KING, WHITE_KING)
+ROOKS = (WHITE_ROOK, BLACK_ROOK)
+BISHOPS = (BLACK_BISHOP, WHITE_BISHOP)
+STEPPING_PIECES = (BLACK_KING, WHITE_KING, BLACK_KNIGHT, WHITE_KNIGHT)
+SLIDING_PIECES = (
+    WHITE_ROOK,
+    BLACK_ROOK,
+    WHITE_BISHOP,
+    BLACK_BISHOP,
+    WHITE_QUEEN,
+    BLACK_QUEEN,
 )
 
 BOARD_SIZE = 8
@@ -146,6 +175,73 @@ def valid_move_format(move: str) -> bool:
     return valid_position_format(origin) and valid_position_format(destination)
 
 
+def side_occupancy(board: Board, whites_turn: bool) -> int:
+    """Builds a 64-bit occupancy mask of the given player's pieces.
+
+    Square (row, col) maps to bit row * BOARD_SIZE + col, so callers can walk
+    the player's pieces with bit tricks instead of scanning all 64 squares.
+
+    Parameters:
+        board (Board): The current board state.
+        whites_turn (bool): True iff the mask is for the white pieces.
+
+    Returns:
+        (int): A bitboard with one bit set per piece of the given colour.
+    """
+    pieces = WHITE_PIECES if whites_turn else BLACK_PIECES
+    occupancy = 0
+    square = 0
+    for row in board:
+        for piece in row:
+            if piece in pieces:
+                occupancy |= 1 << square
+            square += 1
+    return occupancy
+
+
+# Zobrist table: one random 64-bit value per (piece, square) pair. The seed
+# only fixes the table within/across runs; any values work as long as they
+# stay constant for the lifetime of the caches keyed on them.
+_zobrist_random = random.Random(20211203)
+ZOBRIST = {
+    piece: tuple(
+        _zobrist_random.getrandbits(64)
+        for _ in range(BOARD_SIZE * BOARD_SIZE)
+    )
+    for piece in sorted(BLACK_PIECES | WHITE_PIECES)
+}
+
+# How many entries the transposition caches may hold before evicting the
+# oldest one.
+CACHE_LIMIT = 100000
+
+_check_cache: "OrderedDict[Tuple[int, bool], bool]" = OrderedDict()
+
+
+@lru_cache(maxsize=8192)
+def board_hash(board: Board) -> int:
+    """Returns the 64-bit Zobrist key of the given board state.
+
+    The board is an immutable value, so the key cannot be maintained
+    incrementally across moves; instead it is recomputed per board and
+    memoized, which still recurs far less than the scans it short-circuits.
+
+    Parameters:
+        board (Board): The current board state.
+
+    Returns:
+        (int): The Zobrist key of the board.
+    """
+    key = 0
+    square = 0
+    for row in board:
+        for piece in row:
+            if piece is not EMPTY:
+                key ^= ZOBRIST[piece][square]
+            square += 1
+    return key
+
+
 def find_piece(piece: str, board: Board) -> Optional[Position]:
     """Returns the position of the piece in the board. If the piece is
         non-unique, the first one found (lowest row, lowest col) will be
@@ -165,6 +261,23 @@ def find_piece(piece: str, board: Board) -> Optional[Position]:
     return None
 
 
+@lru_cache(maxsize=8192)
+def find_king(board: Board, whites_turn: bool) -> Optional[Position]:
+    """Returns the position of the given player's king.
+
+    Memoized on the immutable board, so the 64-square scan runs once per
+    distinct position no matter how often is_in_check probes it.
+
+    Parameters:
+        board (Board): The current board state.
+        whites_turn (bool): True iff the white king is wanted.
+
+    Returns:
+        (Position | None): The king's position, or None if it was captured.
+    """
+    return find_piece(WHITE_KING if whites_turn else BLACK_KING, board)
+
+
 def get_pawn_moves(
     position: Position, board: Board, piece: str
 ) -> Tuple[Position, ...]:
@@ -182,7 +295,7 @@ def get_pawn_moves(
     moves: Tuple[Position, ...] = ()
 
     # Movement direction depends on piece colour
-    if piece == WHITE_PAWN:
+    if piece is WHITE_PAWN:
         start_row = 6
         other_pieces = BLACK_PIECES
         direction = -1
@@ -200,7 +313,7 @@ def get_pawn_moves(
     # Check validity for each move
     if not out_of_bounds(forward_move):
         piece_at_move = piece_at_position(forward_move, board)
-        if piece_at_move == EMPTY:
+        if piece_at_move is EMPTY:
             moves += (forward_move,)
 
     for move in (diag_left_move, diag_right_move):
@@ -212,17 +325,19 @@ def get_pawn_moves(
     if not out_of_bounds(start_move) and position[0] == start_row:
         piece_at_middle = piece_at_position(forward_move, board)
         piece_at_move = piece_at_position(start_move, board)
-        if piece_at_middle == EMPTY and piece_at_move == EMPTY:
+        if piece_at_middle is EMPTY and piece_at_move is EMPTY:
             moves += (start_move,)
 
     return moves
 
 
+@lru_cache(maxsize=4096)
 def get_possible_moves(
     position: Position, board: Board
 ) -> Tuple[Position, ...]:
     """Returns all of the positions reachable in one move by the piece at
-        the given position.
+        the given position. Results are memoized, which is safe because
+        Board is an immutable tuple of strings.
 
     Parameters:
         position (Position): The (row, col) position to move from.
@@ -235,17 +350,17 @@ def get_possible_moves(
     piece = piece_at_position(position, board)
     moves: Tuple[Position, ...] = ()
 
-    if piece == EMPTY:
+    if piece is EMPTY:
         return moves  # no piece here, so no valid moves
 
     # Pawns
-    if piece in (WHITE_PAWN, BLACK_PAWN):
+    if piece in PAWNS:
         return get_pawn_moves(position, board, piece)
 
     # Non extendable paths: king, knight
-    if piece in (BLACK_KING, WHITE_KING, BLACK_KNIGHT, WHITE_KNIGHT):
+    if piece in STEPPING_PIECES:
         deltas: Tuple[Position, ...] = (
-            KING_DELTAS if piece in (BLACK_KING, WHITE_KING) else KNIGHT_DELTAS
+            KING_DELTAS if piece in KINGS else KNIGHT_DELTAS
         )
 
         for d_row, d_col in deltas:
@@ -256,7 +371,7 @@ def get_possible_moves(
 
             candidate_row, candidate_column = candidate_position
             piece_at_candidate = board[candidate_row][candidate_column]
-            if piece_at_candidate == EMPTY:
+            if piece_at_candidate is EMPTY:
                 moves += (candidate_position,)
             elif (piece in BLACK_PIECES) is not (
                 piece_at_candidate in BLACK_PIECES
@@ -266,17 +381,10 @@ def get_possible_moves(
                 moves += (candidate_position,)
 
     # Extendable paths: rook, bishop, queen
-    if piece in (
-        WHITE_ROOK,
-        BLACK_ROOK,
-        WHITE_BISHOP,
-        BLACK_BISHOP,
-        WHITE_QUEEN,
-        BLACK_QUEEN,
-    ):
-        if piece in (WHITE_ROOK, BLACK_ROOK):
+    if piece in SLIDING_PIECES:
+        if piece in ROOKS:
             deltas = ROOK_DELTAS
-        elif piece in (BLACK_BISHOP, WHITE_BISHOP):
+        elif piece in BISHOPS:
             deltas = BISHOP_DELTAS
         else:
             deltas = QUEEN_DELTAS
@@ -297,7 +405,7 @@ def get_possible_moves(
                 # Make sure there's nothing blocking the square
                 candidate_row, candidate_column = candidate_position
                 piece_at_candidate = board[candidate_row][candidate_column]
-                if piece_at_candidate == EMPTY:
+                if piece_at_candidate is EMPTY:
                     moves += (candidate_position,)
                 elif (piece in BLACK_PIECES) is not (
                     piece_at_candidate in BLACK_PIECES
@@ -312,8 +420,67 @@ def get_possible_moves(
     return moves
 
 
+def is_square_attacked(position: Position, board: Board,
+                       by_white: bool) -> bool:
+    """Determines whether the given square is attacked by any piece of the
+        given colour, scanning outwards from the square rather than
+        generating every enemy move.
+
+    Parameters:
+        position (Position): The (row, col) square to test.
+        board (Board): The current board state.
+        by_white (bool): True iff asking about attacks by white.
+
+    Returns:
+        (bool): True iff a piece of that colour attacks the square.
+    """
+    row, col = position
+    if by_white:
+        pawn, knight, king = WHITE_PAWN, WHITE_KNIGHT, WHITE_KING
+        rook, bishop, queen = WHITE_ROOK, WHITE_BISHOP, WHITE_QUEEN
+    else:
+        pawn, knight, king = BLACK_PAWN, BLACK_KNIGHT, BLACK_KING
+        rook, bishop, queen = BLACK_ROOK, BLACK_BISHOP, BLACK_QUEEN
+
+    # A pawn attacks this square if it sits one attacking-delta behind it
+    for d_row, d_col in pawn_attacking_deltas(by_white):
+        attacker = (row - d_row, col - d_col)
+        if not out_of_bounds(attacker) \
+                and board[attacker[0]][attacker[1]] is pawn:
+            return True
+
+    for d_row, d_col in KNIGHT_DELTAS:
+        attacker = (row + d_row, col + d_col)
+        if not out_of_bounds(attacker) \
+                and board[attacker[0]][attacker[1]] is knight:
+            return True
+
+    for d_row, d_col in KING_DELTAS:
+        attacker = (row + d_row, col + d_col)
+        if not out_of_bounds(attacker) \
+                and board[attacker[0]][attacker[1]] is king:
+            return True
+
+    # Sliding pieces: the first piece met along each ray decides
+    for deltas, pieces in ((ROOK_DELTAS, (rook, queen)),
+                           (BISHOP_DELTAS, (bishop, queen))):
+        for d_row, d_col in deltas:
+            attacker = (row + d_row, col + d_col)
+            while not out_of_bounds(attacker):
+                piece_at_attacker = board[attacker[0]][attacker[1]]
+                if piece_at_attacker is not EMPTY:
+                    if piece_at_attacker in pieces:
+                        return True
+                    break
+                attacker = (attacker[0] + d_row, attacker[1] + d_col)
+
+    return False
+
+
 def is_in_check(board: Board, whites_turn: bool) -> bool:
-    """Determine if the player whose turn it is, is in check.
+    """Determine if the player whose turn it is, is in check. Results are
+        memoized by Zobrist key, since the same position is probed many
+        times while validating the candidate moves of a single turn.
 
     Parameters:
         board (Board): The current board state
@@ -322,15 +489,17 @@ def is_in_check(board: Board, whites_turn: bool) -> bool:
     Returns:
         (bool): True iff the current player is in check.
     """
-    king = WHITE_KING if whites_turn else BLACK_KING
-    king_position = find_piece(king, board)
-    enemy_pieces = BLACK_PIECES if whites_turn else WHITE_PIECES
-
-    for i, row in enumerate(board):
-        for j, piece in enumerate(row):
-            position = (i, j)
-            if piece in enemy_pieces and king_position in get_possible_moves(
-                position, board
-            ):
-                return True
-    return False
+    key = (board_hash(board), whites_turn)
+    cached = _check_cache.get(key)
+    if cached is not None:
+        return cached
+
+    king_position = find_king(board, whites_turn)
+    in_check = king_position is not None and is_square_attacked(
+        king_position, board, not whites_turn
+    )
+
+    _check_cache[key] = in_check
+    if len(_check_cache) > CACHE_LIMIT:
+        _check_cache.popitem(last=False)
+    return in_check
@@ -0,0 +1,187 @@
+from collections import OrderedDict
+from typing import List, Optional
+
+from simple_chess_game import *
+
+# Piece values in centipawns, used for evaluation and capture ordering
+PIECE_VALUES = {
+    WHITE_PAWN: 100,
+    WHITE_KNIGHT: 320,
+    WHITE_BISHOP: 330,
+    WHITE_ROOK: 500,
+    WHITE_QUEEN: 900,
+    WHITE_KING: 20000,
+    BLACK_PAWN: 100,
+    BLACK_KNIGHT: 320,
+    BLACK_BISHOP: 330,
+    BLACK_ROOK: 500,
+    BLACK_QUEEN: 900,
+    BLACK_KING: 20000,
+}
+
+# Small positional bonus per square, rewarding central control. The table is
+# symmetric, so it applies to both colours without mirroring.
+CENTER_BONUS = tuple(
+    tuple(2 * min(row, 7 - row) * min(col, 7 - col) for col in range(8))
+    for row in range(8)
+)
+
+CHECKMATE_SCORE = 100000
+INFINITY = CHECKMATE_SCORE * 10
+DEFAULT_DEPTH = 3
+
+# Transposition table flags: whether a stored score is exact or only a
+# bound produced by an alpha-beta cutoff
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+_transposition_table: "OrderedDict" = OrderedDict()
+
+
+def evaluate_board(board: Board, whites_turn: bool) -> int:
+    """
+    Statically scores the board for the player whose turn it is.
+
+    Parameters:
+        board (Board): the current board.
+        whites_turn (bool): True if it's white's turn. False otherwise.
+
+    Returns:
+        (int): material plus positional score in centipawns, positive when
+        the player to move is ahead.
+    """
+    score = 0
+    for row_num, row in enumerate(board):
+        for col_num, piece in enumerate(row):
+            if piece is EMPTY:
+                continue
+            value = PIECE_VALUES[piece] + CENTER_BONUS[row_num][col_num]
+            if piece in WHITE_PIECES:
+                score += value
+            else:
+                score -= value
+    return score if whites_turn else -score
+
+
+def get_all_valid_moves(board: Board, whites_turn: bool) -> List[Move]:
+    """
+    Returns every valid move for the player whose turn it is, captures
+    first. Castling, en passant and promotion choices are not searched.
+
+    Parameters:
+        board (Board): the current board.
+        whites_turn (bool): True if it's white's turn. False otherwise.
+
+    Returns:
+        (list<Move>): all valid moves, ordered most-valuable-victim first
+        (ties broken by least-valuable-attacker).
+    """
+    def capture_value(move: Move) -> int:
+        victim = board[move[1][0]][move[1][1]]
+        if victim is EMPTY:
+            return 0
+        attacker = board[move[0][0]][move[0][1]]
+        return PIECE_VALUES[victim] * 10 - PIECE_VALUES[attacker]
+
+    valid_moves = []
+    occupancy = side_occupancy(board, whites_turn)
+    while occupancy:
+        square = (occupancy & -occupancy).bit_length() - 1
+        occupancy &= occupancy - 1
+        position = (square // BOARD_SIZE, square % BOARD_SIZE)
+        moves = get_possible_moves(position, board)
+        for move in moves:
+            if is_move_valid_fast((position, move), board, whites_turn, moves):
+                valid_moves.append((position, move))
+
+    valid_moves.sort(key=capture_value, reverse=True)
+    return valid_moves
+
+
+def negamax(board: Board, depth: int, alpha: int, beta: int,
+            whites_turn: bool) -> int:
+    """
+    Searches the position to the given depth with negamax alpha-beta and
+    returns its score for the player whose turn it is.
+
+    Parameters:
+        board (Board): the current board.
+        depth (int): remaining plies to search.
+        alpha (int): best score the player to move is guaranteed so far.
+        beta (int): best score the opponent is guaranteed so far.
+        whites_turn (bool): True if it's white's turn. False otherwise.
+
+    Returns:
+        (int): the score of the position in centipawns; mates score as
+        CHECKMATE_SCORE plus remaining depth, so faster mates win.
+    """
+    key = (board_hash(board), whites_turn)
+    entry = _transposition_table.get(key)
+    if entry is not None and entry[0] >= depth:
+        _, flag, score = entry
+        if flag == EXACT \
+                or (flag == LOWER_BOUND and score >= beta) \
+                or (flag == UPPER_BOUND and score <= alpha):
+            return score
+
+    if depth == 0:
+        return evaluate_board(board, whites_turn)
+
+    moves = get_all_valid_moves(board, whites_turn)
+    if not moves:
+        if is_in_check(board, whites_turn):
+            return -(CHECKMATE_SCORE + depth)
+        return 0  # stalemate
+
+    original_alpha = alpha
+    best = -INFINITY
+    for move in moves:
+        score = -negamax(update_board(board, move), depth - 1,
+                         -beta, -alpha, not whites_turn)
+        if score > best:
+            best = score
+        if best > alpha:
+            alpha = best
+        if alpha >= beta:
+            break  # opponent avoids this line entirely
+
+    if best <= original_alpha:
+        flag = UPPER_BOUND
+    elif best >= beta:
+        flag = LOWER_BOUND
+    else:
+        flag = EXACT
+    _transposition_table[key] = (depth, flag, best)
+    if len(_transposition_table) > CACHE_LIMIT:
+        _transposition_table.popitem(last=False)
+
+    return best
+
+
+def find_best_move(board: Board, whites_turn: bool,
+                   depth: int = DEFAULT_DEPTH) -> Optional[Move]:
+    """
+    Returns the best move found for the player whose turn it is, or None
+    if that player has no valid moves.
+
+    Parameters:
+        board (Board): the current board.
+        whites_turn (bool): True if it's white's turn. False otherwise.
+        depth (int): plies to search.
+
+    Returns:
+        (Move | None): the highest-scoring move at the requested depth.
+    """
+    best_move = None
+    best_score = -INFINITY
+    alpha = -INFINITY
+    for move in get_all_valid_moves(board, whites_turn):
+        score = -negamax(update_board(board, move), depth - 1,
+                         -INFINITY, -alpha, not whites_turn)
+        if score > best_score:
+            best_score = score
+            best_move = move
+        if best_score > alpha:
+            alpha = best_score
+    return best_move
@@ -1,6 +1,26 @@
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Optional, Tuple
 from chess_game_support import *
 
+_can_move_cache: "OrderedDict[Tuple[int, bool], bool]" = OrderedDict()
+
+# The only four king moves that can ever be a castle attempt
+LEGAL_CASTLE_MOVES = frozenset((
+    ((7, 4), (7, 6)),
+    ((7, 4), (7, 2)),
+    ((0, 4), (0, 6)),
+    ((0, 4), (0, 2)),
+))
+
+# Per-direction castling data, indexed by whether the king moves right:
+# (rook's column, step direction, squares the king crosses, index of the
+# rook's flag in castling_info, column offsets that must be empty)
+CASTLE_DATA = (
+    (0, -1, 5, 0, (-1, -2, -3)),
+    (7, 1, 4, 2, (1, 2)),
+)
+
 
 def initial_state() -> Board:
     """
@@ -11,7 +31,8 @@ def initial_state() -> Board:
     Returns:
         (Board): the initial board state
     """
-    return "rnbqkbnr", "pppppppp", "........", "........", "........", "........", "PPPPPPPP", "RNBQKBNR"
+    return ("rnbqkbnr", "pppppppp", EMPTY_ROW, EMPTY_ROW,
+            EMPTY_ROW, EMPTY_ROW, "PPPPPPPP", "RNBQKBNR")
 
 
 def print_board(board: Board) -> None:
@@ -21,13 +42,12 @@ def print_board(board: Board) -> None:
     Parameters:
         board (Board): the current board
     """
-    row_num = BOARD_SIZE
-    for row in board:
-        print(row + f'  {row_num}')
-        row_num -= 1
-    print('\nabcdefgh')
+    lines = [f'{row}  {BOARD_SIZE - row_num}' for row_num, row in enumerate(board)]
+    lines.append('\nabcdefgh')
+    print('\n'.join(lines))
 
 
+@lru_cache(maxsize=128)
 def square_to_position(square: str) -> Position:
     """
     Converts chess notation to its (row, col): Position equivalent.
@@ -45,6 +65,7 @@ def square_to_position(square: str) -> Position:
         return x, y
 
 
+@lru_cache(maxsize=128)
 def process_move(user_input: str) -> Move:
     """
     Converts the user input to a Move based on (row, col): Position. Assume
@@ -74,14 +95,13 @@ def change_position(board: Board, position: Position, character: str) -> Board:
     Returns:
         (Board): the new board
     """
-    new_board = []
-    for row_num in range(BOARD_SIZE):
-        if row_num == position[0]:
-            row = board[row_num][:position[1]] + character + board[row_num][position[1] + 1:]
-            new_board.append(row)
-        else:
-            new_board.append(board[row_num])
-    return tuple(new_board)
+    row, col = position
+    # One buffer edit instead of slicing the row into two halves and
+    # concatenating, which allocates three intermediate strings
+    buffer = bytearray(board[row], "ascii")
+    buffer[col] = ord(character)
+    new_row = EMPTY_ROW if buffer == EMPTY_ROW_BYTES else buffer.decode("ascii")
+    return board[:row] + (new_row,) + board[row + 1:]
 
 
 def clear_position(board: Board, position: Position) -> Board:
@@ -111,9 +131,30 @@ def update_board(board: Board, move: Move) -> Board:
     Returns:
         (Board): a new board
     """
-    row, col = move[0]
-    piece = board[row][col]  # get what the piece is going to move
-    return change_position(clear_position(board, move[0]), move[1], piece)
+    (from_row, from_col), (to_row, to_col) = move
+    from_row_str = board[from_row]
+    piece = from_row_str[from_col]  # get what the piece is going to move
+
+    if from_row == to_row:
+        # Both writes land in the same row: do them in one buffer edit and
+        # one tuple splice instead of two of each
+        buffer = bytearray(from_row_str, "ascii")
+        buffer[from_col] = EMPTY_CODE
+        buffer[to_col] = ord(piece)
+        return board[:from_row] + (buffer.decode("ascii"),) + board[from_row + 1:]
+
+    cleared_row = from_row_str[:from_col] + EMPTY + from_row_str[from_col + 1:]
+    if cleared_row == EMPTY_ROW:
+        cleared_row = EMPTY_ROW
+    to_row_str = board[to_row]
+    target_row = to_row_str[:to_col] + piece + to_row_str[to_col + 1:]
+    if from_row < to_row:
+        return (board[:from_row] + (cleared_row,)
+                + board[from_row + 1:to_row] + (target_row,)
+                + board[to_row + 1:])
+    return (board[:to_row] + (target_row,)
+            + board[to_row + 1:from_row] + (cleared_row,)
+            + board[from_row + 1:])
 
 
 def is_current_players_piece(piece: str, whites_turn: bool) -> bool:
@@ -127,7 +168,7 @@ def is_current_players_piece(piece: str, whites_turn: bool) -> bool:
     Returns:
         (bool): True if it's current player's piece
     """
-    return piece in WHITE_PIECES if whites_turn else piece in BLACK_PIECES
+    return piece in SIDE_PIECES[whites_turn]
 
 
 def is_move_valid(move: Move, board: Board, whites_turn: bool) -> bool:
@@ -143,21 +184,56 @@ def is_move_valid(move: Move, board: Board, whites_turn: bool) -> bool:
     Returns:
         (bool): True iff it's a valid move.
     """
-    if not (out_of_bounds(move[0]) and out_of_bounds(move[1])) \
-            and move[0] != move[1] \
-            and is_current_players_piece(piece_at_position(move[0], board), whites_turn) \
-            and (piece_at_position(move[1], board) == EMPTY
-                 or not is_current_players_piece(piece_at_position(move[1], board), whites_turn)) \
-            and move[1] in get_possible_moves(move[0], board) \
-            and not is_in_check(update_board(board, move), whites_turn):
-        return True
+    # Checks are ordered cheapest first so invalid moves bail out before
+    # the expensive move generation and check detection
+    if move[0] == move[1] or out_of_bounds(move[0]) or out_of_bounds(move[1]):
+        return False
+    if not is_current_players_piece(board[move[0][0]][move[0][1]], whites_turn):
+        return False
+    target = board[move[1][0]][move[1][1]]
+    if target is not EMPTY and is_current_players_piece(target, whites_turn):
+        return False
+    if move[1] not in get_possible_moves(move[0], board):
+        return False
+    return not is_in_check(update_board(board, move), whites_turn)
 
-    return False
+
+def is_move_valid_fast(move: Move, board: Board, whites_turn: bool,
+                       possible_moves: Tuple[Position, ...]) -> bool:
+    """
+    Returns true only when the move is valid, given the possible moves for
+    the piece at the move's origin which the caller has already computed.
+    Saves re-deriving them for every candidate destination of one piece.
+
+    Parameters:
+        move (Move): (from_position, to_position)
+        board (Board): the current board.
+        whites_turn (bool): True if it's white's turn. False otherwise.
+        possible_moves (tuple<Position>): the get_possible_moves result for
+            the origin square of the move.
+
+    Returns:
+        (bool): True iff it's a valid move.
+    """
+    # Same cost-ordered checks as is_move_valid, but against the caller's
+    # precomputed possible_moves
+    if move[0] == move[1] or out_of_bounds(move[0]) or out_of_bounds(move[1]):
+        return False
+    if not is_current_players_piece(board[move[0][0]][move[0][1]], whites_turn):
+        return False
+    target = board[move[1][0]][move[1][1]]
+    if target is not EMPTY and is_current_players_piece(target, whites_turn):
+        return False
+    if move[1] not in possible_moves:
+        return False
+    return not is_in_check(update_board(board, move), whites_turn)
 
 
 def can_move(board: Board, whites_turn: bool) -> bool:
     """
-    Returns true only when the player can make a valid move which does not put them in check.
+    Returns true only when the player can make a valid move which does not
+    put them in check. Results are memoized by Zobrist key, as
+    check_game_over probes the same position repeatedly.
 
     Parameters:
         board (Board): the current board.
@@ -166,15 +242,27 @@ def can_move(board: Board, whites_turn: bool) -> bool:
     Returns:
         (bool): True iff the player can make a valid move.
     """
-    for row in range(BOARD_SIZE):
-        for col in range(BOARD_SIZE):
-            position = (row, col)
-            if is_current_players_piece(piece_at_position(position, board), whites_turn):
-                moves = get_possible_moves(position, board)
-                for move in moves:
-                    if is_move_valid((position, move), board, whites_turn):
-                        return True
-    return False
+    key = (board_hash(board), whites_turn)
+    cached = _can_move_cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = False
+    occupancy = side_occupancy(board, whites_turn)
+    while occupancy and not result:
+        square = (occupancy & -occupancy).bit_length() - 1
+        occupancy &= occupancy - 1
+        position = (square // BOARD_SIZE, square % BOARD_SIZE)
+        moves = get_possible_moves(position, board)
+        for move in moves:
+            if is_move_valid_fast((position, move), board, whites_turn, moves):
+                result = True
+                break
+
+    _can_move_cache[key] = result
+    if len(_can_move_cache) > CACHE_LIMIT:
+        _can_move_cache.popitem(last=False)
+    return result
 
 
 def is_stalemate(board: Board, whites_turn: bool) -> bool:
@@ -222,7 +310,8 @@ def check_game_over(board: Board, whites_turn: bool) -> bool:
     return False
 
 
-def attempt_promotion(board: Board, whites_turn: bool) -> Board:
+def attempt_promotion(board: Board, whites_turn: bool,
+                      column: Optional[int] = None) -> Board:
     """
     Checks whether there is a pawn on the board that needs to be promoted.
     Updates the board if necessary.
@@ -230,6 +319,8 @@ def attempt_promotion(board: Board, whites_turn: bool) -> Board:
     Parameters:
         board (Board): the current board.
         whites_turn (bool): True if it's white's turn. False otherwise.
+        column (Optional[int]): the file of the pawn to promote when the
+            caller already knows it; if None, the promotion rank is scanned.
 
     Returns:
         (Board): a new board if promoted. The old one otherwise.
@@ -240,21 +331,20 @@ def attempt_promotion(board: Board, whites_turn: bool) -> Board:
     else:
         row = 7
         pawn = BLACK_PAWN
+    col = board[row].find(pawn) if column is None else column
+    if col == -1:
+        return board
+
     ask_1 = 'What piece would you like (q, n, r, b)? '
     ask_2 = 'Not a valid piece. ' + ask_1
-    for col in range(BOARD_SIZE):
-        if piece_at_position((row, col), board) == pawn:
-            promotion = input(ask_1)
-            while True:
-                # check if it is legal piece
-                if promotion in ('q', 'n', 'r', 'b'):
-                    break
-                promotion = input(ask_2)
+    promotion = input(ask_1)
+    while promotion not in ('q', 'n', 'r', 'b'):
+        # keep asking until it is a legal piece
+        promotion = input(ask_2)
 
-            if whites_turn:
-                promotion = promotion.upper()
-            return change_position(board, (row, col), promotion)
-    return board
+    if whites_turn:
+        promotion = promotion.upper()
+    return change_position(board, (row, col), promotion)
 
 
 def is_valid_castle_attempt(move: Move, board: Board, whites_turn: bool,
@@ -274,42 +364,26 @@ def is_valid_castle_attempt(move: Move, board: Board, whites_turn: bool,
     Returns:
         (bool): True iff the given move is a valid attempt at castling.
     """
-    legal_castle_move = (
-        ((7, 4), (7, 6)),
-        ((7, 4), (7, 2)),
-        ((0, 4), (0, 6)),
-        ((0, 4), (0, 2))
-    )
     from_position, to_position = move
+    from_row, from_col = from_position
+    kings_row = board[from_row]
     king = WHITE_KING if whites_turn else BLACK_KING
     rook = WHITE_ROOK if whites_turn else BLACK_ROOK
 
-    if piece_at_position(from_position, board) == king \
-            and move in legal_castle_move \
+    if kings_row[from_col] is king \
+            and move in LEGAL_CASTLE_MOVES \
             and not castling_info[1]:
-        if from_position[1] < to_position[1]:
-            # moved to right
-            rook_position = (from_position[0], 7)
-            direction = 1
-            squares = 4
-            rook_moved = castling_info[2]
-            no_pieces_between = piece_at_position((from_position[0], from_position[1] + 1), board) is EMPTY \
-                                and piece_at_position((from_position[0], from_position[1] + 2), board) is EMPTY
-        else:
-            # moved to left
-            rook_position = (from_position[0], 0)
-            direction = -1
-            squares = 5
-            rook_moved = castling_info[0]
-            no_pieces_between = piece_at_position((from_position[0], from_position[1] - 1), board) is EMPTY \
-                                and piece_at_position((from_position[0], from_position[1] - 2), board) is EMPTY \
-                                and piece_at_position((from_position[0], from_position[1] - 3), board) is EMPTY
-        if piece_at_position(rook_position, board) == rook \
-                and not rook_moved \
+        rook_col, direction, squares, rook_index, empty_offsets = \
+            CASTLE_DATA[from_col < to_position[1]]
+        no_pieces_between = all(
+            kings_row[from_col + offset] is EMPTY for offset in empty_offsets
+        )
+        if kings_row[rook_col] is rook \
+                and not castling_info[rook_index] \
                 and no_pieces_between:
-            for i in range(squares):  # not in check all the way
-                move_to_square = (from_position, (from_position[0], from_position[1] + i * direction))
-                if is_in_check(update_board(board, move_to_square), whites_turn):
+            for i in range(squares):  # not attacked all the way
+                square = (from_row, from_col + i * direction)
+                if is_square_attacked(square, board, not whites_turn):
                     return False
             return True
     return False
@@ -368,8 +442,8 @@ def is_valid_en_passant(
             and en_passant_position == move[1] \
             and to_position[0] == from_position[0] + direction \
             and from_position[0] == should_start_at_row \
-            and piece_at_position(from_position, board) == self_pawn \
-            and piece_at_position((from_position[0], to_position[1]), board) == other_pawn:
+            and board[from_position[0]][from_position[1]] is self_pawn \
+            and board[from_position[0]][to_position[1]] is other_pawn:
         return True
     return False
 
@@ -408,16 +482,12 @@ def update_castling_info(
         (tuple<bool, bool, bool>): new castling_info
     """
     row = 7 if whites_turn else 0
-    rook_king_rook_position = ((row, 0), (row, 4), (row, 7))
-    castling_info_list = list(castling_info)
-
-    for i, moved in enumerate(castling_info_list):
-        if moved:
-            continue
-        if move[0] == rook_king_rook_position[i]:
-            castling_info_list[i] = True
-
-    return tuple(castling_info_list)
+    from_position = move[0]
+    return (
+        castling_info[0] or from_position == (row, 0),
+        castling_info[1] or from_position == (row, 4),
+        castling_info[2] or from_position == (row, 7),
+    )
 
 
 def update_en_passant_position(move: Move, board: Board, whites_turn: bool) -> Optional:
@@ -441,7 +511,7 @@ def update_en_passant_position(move: Move, board: Board, whites_turn: bool) -> O
         pawn = BLACK_PAWN
         should_at_row = 3
 
-    if piece_at_position(to_position, board) == pawn \
+    if board[to_position[0]][to_position[1]] is pawn \
             and to_position[0] == should_at_row \
             and to_position[0] - from_position[0] == 2 * direction:
         return from_position[0] + direction, from_position[1]
@@ -494,8 +564,12 @@ def main():
             print('Invalid move\n')
             continue
 
-        # after performing move
-        board = attempt_promotion(board, whites_turn)
+        # after performing move: only a pawn that just reached the far rank
+        # can promote, so most turns skip attempt_promotion entirely
+        to_row, to_col = move[1]
+        if to_row == (0 if whites_turn else 7) \
+                and board[to_row][to_col] is (WHITE_PAWN if whites_turn else BLACK_PAWN):
+            board = attempt_promotion(board, whites_turn, to_col)
 
         if whites_turn:
             castling_info_white = update_castling_info(move, whites_turn, castling_info)